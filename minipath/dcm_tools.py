@@ -5,21 +5,66 @@ import pandas as pd
 from google.auth.transport.requests import AuthorizedSession
 import google.auth
 import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 def get_single_dcm_img(dcm_input) -> np.ndarray:
     """
     Generate a grid image from a multi-frame DICOM object.
 
     :param dcm_input: DICOM object containing multiple frames.
-    :return: Numpy array representing the concatenated grid image.
+    :return: Numpy array of shape (TotalPixelMatrixRows, TotalPixelMatrixColumns[, samples]) representing the
+        concatenated grid image. The channel axis is omitted when SamplesPerPixel is 1.
+        For uncompressed 8-bit data the result can be a read-only view of PixelData (see read_pixel_frames);
+        call .copy() before writing into it.
     """
     dcm, total_pixel_matrix_columns, total_pixel_matrix_rows, columns, rows, grid_rows, grid_cols = parse_dcm_info(
         dcm_input)
 
-    frames = dcm.pixel_array
-    #img = Image.fromarray(frames)
-    #img.save('test/dcm.png')
-    return frames
+    frames = read_pixel_frames(dcm)
+    if int(getattr(dcm, 'NumberOfFrames', 1)) <= 1:
+        #img = Image.fromarray(frames)
+        #img.save('test/dcm.png')
+        return frames
+
+    # Tile the (num_frames, rows, columns, channels) stack into one image with a single reshape/transpose.
+    # Missing trailing frames are padded with white so they read as background.
+    num_tiles = grid_rows * grid_cols
+    frames = frames[:num_tiles]
+    if frames.shape[0] < num_tiles:
+        pad = np.full((num_tiles - frames.shape[0],) + frames.shape[1:], 255, dtype=frames.dtype)
+        frames = np.concatenate([frames, pad])
+    # Single-sample (grayscale) frames have no channel axis, so carry over whatever trailing axes are present
+    samples = frames.shape[3:]
+    grid = frames.reshape((grid_rows, grid_cols, rows, columns) + samples).swapaxes(1, 2)
+    grid = grid.reshape((grid_rows * rows, grid_cols * columns) + samples)
+    return grid[:total_pixel_matrix_rows, :total_pixel_matrix_columns]
+
+
+def read_pixel_frames(dcm) -> np.ndarray:
+    """
+    Return the pixel data of a DICOM object as a NumPy array.
+
+    Uncompressed interleaved 8-bit data is viewed in place with np.frombuffer instead of being copied
+    through pydicom's pixel_array; everything else falls back to pixel_array.
+
+    :param dcm: pydicom FileDataset object.
+    :return: Numpy array of shape (rows, columns[, samples]) or (frames, rows, columns[, samples]).
+        On the frombuffer path the array is a read-only view of PixelData; copy it before writing into it.
+    """
+    transfer_syntax = getattr(getattr(dcm, 'file_meta', None), 'TransferSyntaxUID', None)
+    if (transfer_syntax is None or transfer_syntax.is_compressed or dcm.BitsAllocated != 8
+            or dcm.PhotometricInterpretation not in ('RGB', 'MONOCHROME2')
+            or getattr(dcm, 'PlanarConfiguration', 0) != 0):
+        return dcm.pixel_array
+
+    num_frames = int(getattr(dcm, 'NumberOfFrames', 1))
+    samples = int(dcm.SamplesPerPixel)
+    shape = (dcm.Rows, dcm.Columns) + ((samples,) if samples > 1 else ())
+    if num_frames > 1:
+        shape = (num_frames,) + shape
+    count = int(np.prod(shape))
+    return np.frombuffer(dcm.PixelData, dtype=np.uint8, count=count).reshape(shape)
 
 
 def parse_dcm_info(dcm_input):
@@ -59,15 +104,70 @@ def read_dicom(dcm_input):
     raise f"Could not complete with {dcm_input}"
 
 
-def read_dicomweb(dcm_input):
+DICOMWEB_HEADERS = {"Accept": "application/dicom; transfer-syntax=*"}
+
+# Lazily created and reused across calls so credential discovery and connection pools are set up once
+_session: Optional[AuthorizedSession] = None
+_storage_client: Optional[storage.Client] = None
+
+
+def _new_dicomweb_session():
     credentials, _ = google.auth.default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
     # Creates a requests Session object with the credentials.
-    session = AuthorizedSession(credentials)
+    return AuthorizedSession(credentials)
+
+
+def _get_session():
+    """
+    Return the shared DICOMweb session, creating it on first use.
+
+    AuthorizedSession refreshes its credentials before a request once they expire,
+    so the cached session stays usable for long-running jobs.
+    """
+    global _session
+    if _session is None:
+        _session = _new_dicomweb_session()
+    return _session
+
 
-    headers = {"Accept": "application/dicom; transfer-syntax=*"}
-    response = session.get(dcm_input, headers=headers)
-    response.raise_for_status()
-    return pydicom.dcmread(io.BytesIO(response.content))
+def _get_storage_client():
+    """Return the shared Google Cloud Storage client, creating it on first use."""
+    global _storage_client
+    if _storage_client is None:
+        _storage_client = storage.Client()
+    return _storage_client
+
+
+def read_dicomweb(dcm_input, session=None):
+    """
+    Read a DICOM instance from a DICOMweb URL.
+
+    :param dcm_input: DICOMweb URL of the instance.
+    :param session: Optional AuthorizedSession to use instead of the shared module session.
+    :return: pydicom FileDataset object.
+    """
+    if session is None:
+        session = _get_session()
+
+    # The context manager releases the connection back to the pool as soon as the body is read
+    with session.get(dcm_input, headers=DICOMWEB_HEADERS) as response:
+        response.raise_for_status()
+        return pydicom.dcmread(io.BytesIO(response.content))
+
+
+def read_dicomweb_batch(urls, max_workers=8):
+    """
+    Read several DICOM instances from DICOMweb URLs concurrently.
+
+    Downloads are network-bound, so they run on a thread pool sharing one AuthorizedSession.
+
+    :param urls: List of DICOMweb URLs.
+    :param max_workers: Maximum number of concurrent downloads.
+    :return: List of pydicom FileDataset objects in the same order as urls.
+    """
+    session = _get_session()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda url: read_dicomweb(url, session=session), urls))
 
 
 def read_dicom_from_gcs(gcs_path):
@@ -84,7 +184,7 @@ def read_dicom_from_gcs(gcs_path):
 
     # Initialize a client and get the bucket
     try:
-        client = storage.Client()
+        client = _get_storage_client()
         bucket = client.get_bucket(bucket_name)
         blob = bucket.blob(file_name)
     except:
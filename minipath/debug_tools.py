@@ -1,8 +1,61 @@
 import matplotlib.pyplot as plt
 import cv2
+import logging
+import os
 import numpy as np
 
-def save_padded_array_with_labels(padded_array, patch_size=(8, 8), output_path="padded_array_with_labels.png"):
+# Drawing colors, in the buffer's own (BGR) channel order as written by cv2.imwrite
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+RED = (0, 0, 255)
+
+_debug_fig = None
+_debug_ax = None
+
+
+def _write_image(output_path, image, fmt="png"):
+    """
+    Write a debug image with cv2, as PNG or as JPEG when lossy output is acceptable.
+
+    Args:
+        output_path (str): File path to save the image. For JPEG the suffix is replaced with .jpg.
+        image (np.ndarray): The image to write.
+        fmt (str): Either "png" or "jpg".
+
+    Returns:
+        str: The path the image was written to.
+
+    Raises:
+        OSError: If cv2 could not write the file (e.g. the directory does not exist).
+    """
+    if fmt == "jpg":
+        output_path = os.path.splitext(output_path)[0] + ".jpg"
+        written = cv2.imwrite(output_path, image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    elif fmt == "png":
+        written = cv2.imwrite(output_path, image, [cv2.IMWRITE_PNG_COMPRESSION, 3])
+    else:
+        raise ValueError(f"Unsupported debug image format: {fmt}")
+    if not written:
+        raise OSError(f"Could not write {output_path}")
+    return output_path
+
+
+def _paint_grid(image, patch_size, color=WHITE):
+    """
+    Draw 1-px grid lines at every patch boundary with two strided slice assignments.
+
+    Args:
+        image (np.ndarray): The image to draw on in place.
+        patch_size (tuple): The size of each patch (height, width).
+        color (tuple): Line color in the image's channel order.
+    """
+    patch_h, patch_w = patch_size
+    image[::patch_h, :, :] = color
+    image[:, ::patch_w, :] = color
+
+
+def save_padded_array_with_labels(padded_array, patch_size=(8, 8), output_path="padded_array_with_labels.png",
+                                  copy=True, fmt="png"):
     """
     Display the padded array with (8, 8) patches outlined and their (x, y) positions labeled.
 
@@ -10,6 +63,8 @@ def save_padded_array_with_labels(padded_array, patch_size=(8, 8), output_path="
         padded_array (np.ndarray): The input array to display (shape must be divisible by patch_size).
         patch_size (tuple): The size of each patch (height, width).
         output_path (str): File path to save the resulting image.
+        copy (bool): If False, the grid is drawn on padded_array in place instead of on a copy.
+        fmt (str): Output format, "png" or "jpg". JPEG is much faster to encode for large debug images.
 
     """
     # Validate array shape
@@ -18,60 +73,57 @@ def save_padded_array_with_labels(padded_array, patch_size=(8, 8), output_path="
     if height % patch_h != 0 or width % patch_w != 0:
         raise ValueError("The padded_array dimensions must be divisible by the patch size.")
 
-    # Create a copy to draw on
-    image_with_grid = padded_array.copy()
-
-    # Scale image for higher resolution labels
-    scale_factor = 6  # Scale up the image for better text rendering
-    scaled_h, scaled_w = height * scale_factor, width * scale_factor
-    image_with_grid = cv2.resize(image_with_grid, (scaled_w, scaled_h), interpolation=cv2.INTER_NEAREST)
-
-    # Update patch size to scaled dimensions
-    patch_h, patch_w = patch_h * scale_factor, patch_w * scale_factor
+    # Create a copy to draw on unless the caller allows drawing in place
+    image_with_grid = padded_array.copy() if copy else padded_array
 
     # Define font and scaling for text
     font = cv2.FONT_HERSHEY_SIMPLEX
     font_scale = 0.3
     thickness = 1
-    color = (0, 0, 255)  # Red text
+    color = RED  # Red text
 
-    # Draw grid and label patches
-    for y in range(0, scaled_h, patch_h):
-        for x in range(0, scaled_w, patch_w):
-            # Draw rectangle for the patch
-            cv2.rectangle(image_with_grid, (x, y), (x + patch_w, y + patch_h), (255, 255, 255), 1)
+    # Draw the grid at native resolution
+    _paint_grid(image_with_grid, (patch_h, patch_w), WHITE)
 
-            # Calculate center of the patch for text placement
-            text_x = x + patch_w // 4
-            text_y = y + patch_h // 2
+    # Scale image once for higher resolution labels
+    scale_factor = 6  # Scale up the image for better text rendering
+    scaled_h, scaled_w = height * scale_factor, width * scale_factor
+    image_with_grid = cv2.resize(image_with_grid, None, fx=scale_factor, fy=scale_factor,
+                                 interpolation=cv2.INTER_NEAREST)
 
-            # Label the patch with its (x, y) coordinates
-            label = f"({x // patch_w}, {y // patch_h})"
-            cv2.putText(image_with_grid, label, (text_x, text_y), font, font_scale, color, thickness)
+    # Update patch size to scaled dimensions
+    patch_h, patch_w = patch_h * scale_factor, patch_w * scale_factor
 
-    # Convert to RGB for Matplotlib display
-    image_with_grid = cv2.cvtColor(image_with_grid, cv2.COLOR_BGR2RGB)
+    # Label each patch with its (x, y) coordinates, placed near the center of the patch
+    text_dx, text_dy = patch_w // 4, patch_h // 2
+    labels = [
+        (f"({px}, {py})", (x + text_dx, y + text_dy))
+        for py, y in enumerate(range(0, scaled_h, patch_h))
+        for px, x in enumerate(range(0, scaled_w, patch_w))
+    ]
+    put_text = cv2.putText
+    for label, origin in labels:
+        put_text(image_with_grid, label, origin, font, font_scale, color, thickness)
 
-    # Save the image using Matplotlib with high DPI
-    plt.figure(figsize=(20, 20), dpi=300)
-    plt.imshow(image_with_grid)
-    plt.axis("off")
-    plt.title("Padded Array with Patch Labels")
-    plt.savefig(output_path, bbox_inches="tight", pad_inches=0)
-    plt.close()
+    # Write the array in its native channel order; no full-image color conversion
+    cv2.putText(image_with_grid, "Padded Array with Patch Labels", (10, 20), font, 0.6, WHITE, 1)
+    output_path = _write_image(output_path, image_with_grid, fmt)
 
-    print(f"High-quality image saved to {output_path}")
+    logging.debug(f"High-quality image saved to {output_path}")
 
 
 def plot_fg(foreground):
-    plt.figure(figsize=(8, 8))
-    plt.imshow(foreground)
-    plt.title("Foreground (Tissue Regions)")
-    plt.axis("off")
-    plt.savefig('test/fg.png', bbox_inches="tight", pad_inches=0)
-    plt.close()
-
-def save_padded_array_with_coords(padded_array, patch_size=(8, 8), output_path="test/padded_array_with_labels.png", patch_coords=None, scale_factor=5):
+    # Reuse one figure across calls instead of allocating a new render buffer each time
+    global _debug_fig, _debug_ax
+    if _debug_fig is None:
+        _debug_fig, _debug_ax = plt.subplots(figsize=(8, 8))
+    _debug_ax.clear()
+    _debug_ax.imshow(foreground)
+    _debug_ax.set_axis_off()
+    _debug_fig.savefig('test/fg.png', dpi=100, bbox_inches="tight", pad_inches=0, pil_kwargs={"compress_level": 1})
+
+def save_padded_array_with_coords(padded_array, patch_size=(8, 8), output_path="test/padded_array_with_labels.png", patch_coords=None, scale_factor=5,
+                                  copy=True, fmt="png"):
     """
     Save the padded array as an image with patches outlined and their (x, y) positions labeled.
     The image is scaled to improve text readability.
@@ -82,43 +134,52 @@ def save_padded_array_with_coords(padded_array, patch_size=(8, 8), output_path="
         output_path (str): File path to save the resulting image.
         patch_coords (list of tuple): Coordinates of patches with calculated entropy.
         scale_factor (int): Factor to scale the image for better readability.
+        copy (bool): If False, the grid is drawn on padded_array in place instead of on a copy.
+        fmt (str): Output format, "png" or "jpg". JPEG is much faster to encode for large debug images.
     """
     height, width, _ = padded_array.shape
     patch_h, patch_w = patch_size
+    coord_set = set(patch_coords) if patch_coords else set()
 
-    # Scale the image
-    scaled_h, scaled_w = height * scale_factor, width * scale_factor
-    scaled_array = cv2.resize(padded_array, (scaled_w, scaled_h), interpolation=cv2.INTER_NEAREST)
-
-    # Adjust patch size to scaled dimensions
-    patch_h, patch_w = patch_h * scale_factor, patch_w * scale_factor
+    # Create a copy to draw on unless the caller allows drawing in place
+    image_with_grid = padded_array.copy() if copy else padded_array
 
     # Prepare for drawing
     font = cv2.FONT_HERSHEY_SIMPLEX
     font_scale = 0.3  # Scale the font size
     thickness = 1   # Scale the thickness
-    color = (0, 0, 255)  # Red text for entropy patches
-    grid_color = (255, 255, 255)  # White for grid
-
-    # Draw grid and labels
-    for y in range(0, scaled_h, patch_h):
-        for x in range(0, scaled_w, patch_w):
-            grid_color = (0, 255, 0) if (y // patch_h, x // patch_w) in patch_coords else (255, 255, 255)
-            cv2.rectangle(scaled_array, (x, y), (x + patch_w, y + patch_h), grid_color, 1)
-            if patch_coords and (y // patch_h, x // patch_w) in patch_coords:
-                cv2.putText(scaled_array, f"({x // patch_w}, {y // patch_h})",
-                            (x + 5, y + patch_h // 2), font, font_scale, color, thickness)
-
-    # Convert to RGB for Matplotlib
-    scaled_array = cv2.cvtColor(scaled_array, cv2.COLOR_BGR2RGB)
-
-    # Save the image using Matplotlib
-    plt.figure(figsize=(12, 12), dpi=300)
-    plt.imshow(scaled_array)
-    plt.axis("off")
-    plt.title("Padded Array with Patch Labels")
-    plt.savefig(output_path, bbox_inches="tight", pad_inches=0)
-    plt.close()
+    color = RED  # Red text for entropy patches
+    grid_color = WHITE  # White for grid
+
+    # Draw the grid at native resolution, then outline the selected patches in green
+    _paint_grid(image_with_grid, (patch_h, patch_w), grid_color)
+    # Selected (row, col) cells as an array so box and label positions are computed in one step
+    if coord_set:
+        cells = np.array(list(coord_set), dtype=np.int64).reshape(-1, 2)
+        corners = cells[:, ::-1] * (patch_w, patch_h)
+        boxes = np.hstack([corners, corners + (patch_w, patch_h)]).tolist()
+        rectangle = cv2.rectangle
+        for x_min, y_min, x_max, y_max in boxes:
+            rectangle(image_with_grid, (x_min, y_min), (x_max, y_max), GREEN, 1, lineType=cv2.LINE_4)
+
+    # Scale the image once
+    scaled_array = cv2.resize(image_with_grid, None, fx=scale_factor, fy=scale_factor,
+                              interpolation=cv2.INTER_NEAREST)
+
+    # Adjust patch size to scaled dimensions
+    patch_h, patch_w = patch_h * scale_factor, patch_w * scale_factor
+
+    # Draw labels for the selected patches only
+    if coord_set:
+        origins = (cells[:, ::-1] * (patch_w, patch_h) + (5, patch_h // 2)).tolist()
+        labels = [(f"({col}, {row})", tuple(origin)) for (row, col), origin in zip(cells.tolist(), origins)]
+        put_text = cv2.putText
+        for label, origin in labels:
+            put_text(scaled_array, label, origin, font, font_scale, color, thickness)
+
+    # Write the array in its native channel order; no full-image color conversion
+    cv2.putText(scaled_array, "Padded Array with Patch Labels", (10, 20), font, 0.6, WHITE, 1)
+    _write_image(output_path, scaled_array, fmt)
 
 
 
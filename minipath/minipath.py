@@ -1,13 +1,12 @@
 from pydicom.encaps import generate_pixel_data_frame
 from dotenv import load_dotenv
 from tqdm import tqdm
-from multiprocessing import Pool, shared_memory
+from multiprocessing import Pool
 import random
 
 load_dotenv()
 from .dcm_tools import *
 from sklearn.cluster import KMeans
-from skimage.measure import shannon_entropy
 from skimage.util import view_as_blocks
 import logging
 import io
@@ -20,6 +19,29 @@ import cv2
 
 #from .debug_tools import *
 
+# Mean pixel value at which a low-res patch or high-res frame is treated as background (white glass)
+BACKGROUND_MEAN = 220
+
+# Number of patches histogrammed at a time in ImageEntropySampler.process_patches
+ENTROPY_CHUNK_SIZE = 4096
+
+
+def _shannon_entropy_from_counts(counts: np.ndarray) -> np.ndarray:
+    """
+    Compute the base-2 Shannon entropy of each row of a histogram array.
+
+    Args:
+        counts (np.ndarray): Array of shape (n, 256) with pixel value counts per patch.
+
+    Returns:
+        np.ndarray: Entropy value for each row.
+    """
+    p = counts / counts.sum(axis=-1, keepdims=True)
+    # log(0) is left as 0, so empty bins contribute nothing to the sum after the in-place multiply
+    log_p = np.log(p, where=p > 0, out=np.zeros_like(p))
+    p *= log_p
+    return -p.sum(axis=-1) / np.log(2)
+
 class MiniPath:
     def __init__(self, csv: Optional[str] = None, subset: bool = True, patch_per_cluster: int = 1, max_k: int = 50,
                  img_size: int = 256, patch_size: int = 8, min_k: int = 8,
@@ -30,7 +52,7 @@ class MiniPath:
 
         Args:
             csv (Optional[str]): Path to a CSV file containing metadata for the images.
-            subset (bool): Whether to use a subset of the dataset.
+            subset (bool): Whether to keep only a diverse subset of patches. If False, all tissue patches are kept.
             patch_per_cluster (int): Number of patches to sample per cluster.
             max_k (int): Maximum number of clusters.
             img_size (int): The size of the image.
@@ -76,7 +98,9 @@ class MiniPath:
 
         # Use the ImageEntropySampler to process the image and get representative patches
         sampler = ImageEntropySampler(image, patch_size=(self.patch_size, self.patch_size),
-                                      top_n=self.max_k, patch_per_cluster=self.patch_per_cluster)
+                                      top_n=self.max_k, patch_per_cluster=self.patch_per_cluster,
+                                      km_init=self.km_init, km_max_iter=self.km_max_iter, km_n_init=self.km_n_init,
+                                      subset=self.subset)
         selected_patches = sampler.process()
 
         # Store the results
@@ -113,19 +137,26 @@ class MiniPath:
 
         # Iterate over mappings and include all relevant frames
         high_res_patches = []
-        frames_to_keep = [x['frame_id'] for x in mag_pairs.high_mag_frames if x is not None]
-        for mapping in mag_pairs.high_mag_mappings:
-            pixel_range = mapping['high_pixel_range']
-            scaling_factor = mag_pairs.scaling_factor  # Scale from low-mag to high-mag
-            i = 0
+        # Decoded tissue frames keyed by frame id for constant-time lookup
+        frame_arrays = {f['frame_id']: f['img_arr'] for f in mag_pairs.clean_high_mag_frames}
+
+        # Scale every mapping's pixel range from low-mag to high-mag in one vectorized step
+        pixel_ranges = np.array(
+            [[m['high_pixel_range'][k] for k in ('y_min', 'y_max', 'x_min', 'x_max')]
+             for m in mag_pairs.high_mag_mappings],
+            dtype=np.float64
+        ).reshape(-1, 4)
+        scaled_ranges = (pixel_ranges * mag_pairs.scaling_factor).astype(np.int64).tolist()
+
+        for mapping, (row_min, row_max, col_min, col_max) in zip(mag_pairs.high_mag_mappings, scaled_ranges):
             for frame, (row, col) in zip(mapping['frame_numbers'], mapping['row_col']):
-                if frame in frames_to_keep:
-                    img_array = next((f['img_arr'] for f in mag_pairs.clean_high_mag_frames if f['frame_id'] == frame), None)
+                if frame in frame_arrays:
+                    img_array = frame_arrays[frame]
                     high_res_patches.append({
-                        'row_min': int(pixel_range['y_min'] * scaling_factor),
-                        'row_max': int(pixel_range['y_max'] * scaling_factor),
-                        'col_min': int(pixel_range['x_min'] * scaling_factor),
-                        'col_max': int(pixel_range['x_max'] * scaling_factor),
+                        'row_min': row_min,
+                        'row_max': row_max,
+                        'col_min': col_min,
+                        'col_max': col_max,
                         'frame': frame,  # DICOM frame number
                         'row_col': (row, col),  # High-mag grid position
                         'img_array': img_array  # Corresponding high-res image array
@@ -138,7 +169,7 @@ class MiniPath:
 class ImageEntropySampler:
     def __init__(self, image: np.ndarray, patch_size: tuple[int, int] = (8, 8), top_n: int = 10,
                  patch_per_cluster: int = 1,
-                 km_init: str = 'k-means++', km_max_iter: int = 300, km_n_init: int = 10):
+                 km_init: str = 'k-means++', km_max_iter: int = 300, km_n_init: int = 10, subset: bool = True):
         """
         Initialize the ImageEntropySampler class.
 
@@ -150,6 +181,7 @@ class ImageEntropySampler:
             km_init (str): Initialization method for KMeans clustering.
             km_max_iter (int): Maximum number of iterations for KMeans.
             km_n_init (int): Number of initializations for KMeans.
+            subset (bool): Whether to cluster and sample representatives. If False, all tissue patches are returned.
         """
         self.image = image
         self.patch_size = patch_size
@@ -158,9 +190,11 @@ class ImageEntropySampler:
         self.km_init = km_init
         self.km_max_iter = km_max_iter
         self.km_n_init = km_n_init
+        self.subset = subset
 
         self.image_gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
         self.foreground = None
+        self.foreground_gray = None
         self.entropy_values = []
         self.patch_coords = []
         self.patches = None
@@ -172,8 +206,11 @@ class ImageEntropySampler:
         Returns:
             np.ndarray: Foreground image with background removed.
         """
+        # Otsu on a uint8 image already yields a uint8 mask, so it is used as is without a copy
         _, mask = cv2.threshold(self.image_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        foreground = cv2.bitwise_and(self.image, self.image, mask=mask.astype(np.uint8))
+        foreground = cv2.bitwise_and(self.image, self.image, mask=mask)
+        # Masking the existing grayscale image gives the grayscale foreground without a second color conversion
+        self.foreground_gray = cv2.bitwise_and(self.image_gray, self.image_gray, mask=mask)
         #plot_fg(foreground)
         logging.debug("Background eliminated from the image.")
         return foreground
@@ -184,7 +221,7 @@ class ImageEntropySampler:
         Pad the input image to ensure compatibility with the patch size.
 
         Args:
-            image (np.ndarray): The input image to pad.
+            image (np.ndarray): The input image to pad, either grayscale or with a channel axis.
             patch_size (tuple[int, int]): The size of the patches to ensure divisibility.
 
         Returns:
@@ -192,7 +229,8 @@ class ImageEntropySampler:
         """
         pad_h = (patch_size[0] - (image.shape[0] % patch_size[0])) % patch_size[0]
         pad_w = (patch_size[1] - (image.shape[1] % patch_size[1])) % patch_size[1]
-        padded_image = np.pad(image, ((0, pad_h), (0, pad_w), (0, 0)), mode='constant', constant_values=255)
+        pad_width = ((0, pad_h), (0, pad_w)) + ((0, 0),) * (image.ndim - 2)
+        padded_image = np.pad(image, pad_width, mode='constant', constant_values=255)
         logging.debug(f"Image padded from {image.shape} to {padded_image.shape} to fit patch size: {patch_size}.")
         return padded_image
 
@@ -240,21 +278,29 @@ class ImageEntropySampler:
         num_rows, num_cols = self.patches.shape[:2]
         logging.debug(f"Patch grid dimensions: {num_rows} rows x {num_cols} cols")
 
-        entropy_results = []
-        coords_results = []
-
-        # Flatten the loop for better efficiency
-        for i, j in np.ndindex(self.patches.shape[:2]):
-            patch = self.patches[i, j]  # Extract the patch directly
-            # Skip if background
-            if np.mean(patch) > 220:
-                continue
-            entropy = self.calculate_entropy(patch)
-            entropy_results.append(entropy)
-            coords_results.append((i, j))
-
-        self.entropy_values = np.array(entropy_results)
-        self.patch_coords = coords_results
+        # Skip background patches, keeping grid positions in row-major order
+        patch_means = self.patches.mean(axis=(2, 3, 4, 5))
+        rows_idx, cols_idx = np.nonzero(patch_means <= BACKGROUND_MEAN)
+
+        # Histogram every foreground patch's grayscale pixels in one bincount and take the entropy of each row
+        if self.foreground_gray is None or self.foreground_gray.shape != self.foreground.shape[:2]:
+            self.foreground_gray = cv2.cvtColor(self.foreground, cv2.COLOR_RGB2GRAY)
+        gray_blocks = view_as_blocks(self.foreground_gray, block_shape=self.patch_size)
+        self.patch_coords = list(zip(rows_idx.tolist(), cols_idx.tolist()))
+        if len(rows_idx) == 0:
+            # All-background image: nothing to histogram
+            self.entropy_values = np.empty(0)
+            logging.debug("No foreground patches found.")
+            return
+
+        # Histograms are built in fixed-size chunks so the (n, 256) count matrix never spans the whole slide
+        pixels = gray_blocks[rows_idx, cols_idx].reshape(len(rows_idx), self.patch_size[0] * self.patch_size[1])
+        self.entropy_values = np.empty(len(rows_idx))
+        for start in range(0, len(rows_idx), ENTROPY_CHUNK_SIZE):
+            chunk = pixels[start:start + ENTROPY_CHUNK_SIZE]
+            offsets = np.arange(len(chunk))[:, None] * 256
+            counts = np.bincount((chunk + offsets).ravel(), minlength=len(chunk) * 256).reshape(-1, 256)
+            self.entropy_values[start:start + len(chunk)] = _shannon_entropy_from_counts(counts)
 
         # Debug: Check calculated entropy values and patch coordinates
         logging.debug(f"Calculated entropy for {len(self.entropy_values)} patches.")
@@ -264,30 +310,40 @@ class ImageEntropySampler:
         # Debug: Log number of entropy values before clustering
         logging.debug(f"Number of patches before clustering: {len(self.entropy_values)}")
 
-        if self.top_n >= len(self.entropy_values):
-            return [(self.patches[i, j], (i, j)) for i, j in self.patch_coords]
-
-        # Perform clustering
-        kmeans = KMeans(n_clusters=self.top_n, init=self.km_init, max_iter=self.km_max_iter, n_init=self.km_n_init)
-        cluster_labels = kmeans.fit_predict(self.entropy_values.reshape(-1, 1))
-
-        logging.debug(f'Found {len(set(cluster_labels))} cluster labels')
-
-        sampled_patches = []
-        for cluster in range(self.top_n):
-            cluster_indices = np.where(cluster_labels == cluster)[0]
-            selected_indices = np.random.choice(cluster_indices, size=min(self.patch_per_cluster, len(cluster_indices)),
-                                                replace=False)
-            for idx in selected_indices:
-                col, row = self.patch_coords[idx]
-                patch = self.patches[col, row]  # Extract the patch directly
-                # Ensure the patch has the correct shape
-                if len(patch.shape) > 3:
-                    patch = patch.squeeze()
-                sampled_patches.append((Image.fromarray(patch), (row, col), idx))
+        # Without subsetting, or with too few patches to cluster, every tissue patch is kept
+        if not self.subset or self.top_n >= len(self.entropy_values):
+            return self.build_samples(range(len(self.patch_coords)))
+
+        # float32 halves memory traffic through the Lloyd updates; sklearn keeps the input dtype
+        features = self.entropy_values.astype(np.float32).reshape(-1, 1)
+
+        # With no more distinct feature values than clusters, each value is its own cluster and KMeans is unnecessary.
+        # The check runs on the float32 features so values merged by the cast are not counted twice.
+        unique_values, unique_labels = np.unique(features, return_inverse=True)
+        if len(unique_values) <= self.top_n:
+            n_clusters = len(unique_values)
+            cluster_labels = unique_labels.ravel()
+        else:
+            # Perform clustering
+            n_clusters = self.top_n
+            kmeans = KMeans(n_clusters=n_clusters, init=self.km_init, max_iter=self.km_max_iter, n_init=self.km_n_init)
+            cluster_labels = kmeans.fit_predict(features)
+
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f'Found {np.unique(cluster_labels).size} cluster labels')
+
+        # Group patch indices by cluster with one stable sort instead of scanning all labels once per cluster
+        order = np.argsort(cluster_labels, kind='stable')
+        cluster_sizes = np.bincount(cluster_labels, minlength=n_clusters)
+        selected = []
+        for cluster_indices in np.split(order, np.cumsum(cluster_sizes)[:-1]):
+            selected.extend(np.random.choice(cluster_indices, size=min(self.patch_per_cluster, len(cluster_indices)),
+                                             replace=False))
+        sampled_patches = self.build_samples(selected)
 
         # Debug: Log sampled patches and their coordinates
-        logging.debug(f"Sampled patches: {[(pos, idx) for _, pos, idx in sampled_patches]}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug(f"Sampled patches: {[(pos, idx) for _, pos, idx in sampled_patches]}")
         # save_padded_array_with_coords(self.foreground, patch_size=self.patch_size,
         # output_path="test/highlighted_image.png", patch_coords=self.patch_coords)
 
@@ -295,6 +351,28 @@ class ImageEntropySampler:
             img.save(f'test/{pos[0]}_{pos[1]}.png')"""
         return sampled_patches
 
+    def build_samples(self, indices) -> list:
+        """
+        Materialize (image, position, index) samples for the selected patches only.
+
+        Patches are read from the zero-copy block view, so only the selected ones are copied into images.
+
+        Args:
+            indices (Iterable[int]): Indices into patch_coords of the patches to keep.
+
+        Returns:
+            list: Tuples of (PIL.Image.Image, (row, col), idx) for each selected patch.
+        """
+        samples = []
+        for idx in indices:
+            col, row = self.patch_coords[idx]
+            patch = self.patches[col, row]  # Extract the patch directly
+            # Ensure the patch has the correct shape
+            if len(patch.shape) > 3:
+                patch = patch.squeeze()
+            samples.append((Image.fromarray(patch), (row, col), idx))
+        return samples
+
     def calculate_entropy(self, patch: np.ndarray) -> float:
         """
         Calculate the entropy of a grayscale patch.
@@ -308,7 +386,8 @@ class ImageEntropySampler:
         if len(patch.shape) == 4 and patch.shape[0] == 1:  # Handle (1, H, W, C) case
             patch = patch[0]
         patch_gray = cv2.cvtColor(patch, cv2.COLOR_RGB2GRAY)
-        return shannon_entropy(patch_gray)
+        counts = np.bincount(patch_gray.ravel(), minlength=256)
+        return float(_shannon_entropy_from_counts(counts[None, :])[0])
 
     def process(self):
         """Run the entire processing pipeline."""
@@ -321,6 +400,7 @@ class ImageEntropySampler:
         # Pad the image
         #self.foreground = self.pad_to_size(self.foreground, target_shape=(256, 256, 3))
         self.foreground = self.pad_image(self.foreground, patch_size=self.patch_size)
+        self.foreground_gray = self.pad_image(self.foreground_gray, patch_size=self.patch_size)
 
         # Process patches
         self.process_patches()
@@ -377,15 +457,17 @@ class MagPairs:
             list: List of mappings for each low-mag patch.
         """
         high_res_mappings = []
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
         for idx, patch in enumerate(self.minmax_list):
             mapping = self.map_to_high_mag_with_frames(
                 patch,  # Low-res patch coordinates
-                self.fd,  # High-res frame dictionary
+                self.fd,  # High-res frame array
                 self.scaling_factor
             )
             high_res_mappings.append(mapping)
-            logging.debug(
-                f"Mapped patch {idx} to frames {mapping['frame_numbers']} with pixels {mapping['high_pixel_range']}")
+            if debug:
+                logging.debug(
+                    f"Mapped patch {idx} to frames {mapping['frame_numbers']} with pixels {mapping['high_pixel_range']}")
         return high_res_mappings
 
     @staticmethod
@@ -396,8 +478,9 @@ class MagPairs:
         Args:
             low_res_coords (dict):
                 Dictionary with 'x_min', 'y_min', 'x_max', 'y_max' in low-resolution pixel coordinates.
-            high_res_frame_dict (list of dict):
-                High-resolution frame metadata containing pixel ranges.
+            high_res_frame_dict (np.ndarray):
+                High-resolution frame metadata of shape (n_frames, 7) with columns
+                row_min, row_max, col_min, col_max, frame, row, col.
             scaling_factor (float):
                 Scaling factor between low-res and high-res.
 
@@ -411,7 +494,9 @@ class MagPairs:
         high_y_max = int(low_res_coords['y_max'] * scaling_factor)
 
         # Debug: Validate the scaled ranges
-        logging.debug(f"Low-res pixels: {low_res_coords}")
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        if debug:
+            logging.debug(f"Low-res pixels: {low_res_coords}")
 
         # Initialize mapping result
         mapping_result = {
@@ -425,15 +510,16 @@ class MagPairs:
             'row_col': []
         }
 
-        # Find intersecting frames in the high-res frame dictionary
-        for frame in high_res_frame_dict:
-            if (high_x_min <= frame['row_max'] and high_x_max >= frame['row_min'] and
-                    high_y_min <= frame['col_max'] and high_y_max >= frame['col_min']):
-                mapping_result['frame_numbers'].append(frame['frame'])
-                mapping_result['row_col'].append(frame['row_col'])
+        # Find intersecting frames with one vectorized overlap test over all high-res frames
+        mask = ((high_x_min <= high_res_frame_dict[:, 1]) & (high_x_max >= high_res_frame_dict[:, 0]) &
+                (high_y_min <= high_res_frame_dict[:, 3]) & (high_y_max >= high_res_frame_dict[:, 2]))
+        hits = high_res_frame_dict[mask]
+        mapping_result['frame_numbers'] = hits[:, 4].tolist()
+        mapping_result['row_col'] = [tuple(row_col) for row_col in hits[:, 5:7].tolist()]
 
-        logging.debug(
-            f"High-res pixels: x_min={high_x_min}, y_min={high_y_min}, x_max={high_x_max}, y_max={high_y_max}, row_col={mapping_result['row_col']}")
+        if debug:
+            logging.debug(
+                f"High-res pixels: x_min={high_x_min}, y_min={high_y_min}, x_max={high_x_max}, y_max={high_y_max}, row_col={mapping_result['row_col']}")
         # Warn if no frames were found
         if not mapping_result['frame_numbers']:
             logging.warning(f"No intersecting frames found for low-res coords {low_res_coords}")
@@ -443,7 +529,10 @@ class MagPairs:
     @staticmethod
     def frame_extraction(dcm, high_mag_mappings, num_high_res_frames, batch_size=10):
         """
-        Extract frames from DICOM data using shared memory and batch processing.
+        Extract frames from DICOM data using batch processing.
+
+        The encapsulated PixelData is walked once in the parent process and only the bytes of the
+        requested frames are sent to the workers for decoding.
 
         Args:
             dcm: DICOM object containing PixelData and frame information.
@@ -454,23 +543,12 @@ class MagPairs:
         Returns:
             List of dictionaries with extracted frames as NumPy arrays.
         """
-        # Create shared memory for PixelData
-        pixel_data = np.frombuffer(dcm.PixelData, dtype=np.uint8)
-        shared_mem = shared_memory.SharedMemory(create=True, size=pixel_data.nbytes)
-        shared_pixel_data = np.ndarray(pixel_data.shape, dtype=pixel_data.dtype, buffer=shared_mem.buf)
-        np.copyto(shared_pixel_data, pixel_data)
-
-        # Flatten the frame list for batching
-        frame_tasks = [
-            {
-                'shared_mem_name': shared_mem.name,
-                'total_frames': dcm.NumberOfFrames,
-                'frame_id': frame,
-                'task_index': idx
-            }
-            for idx, mapping in enumerate(high_mag_mappings)
-            for frame in mapping['frame_numbers']
-        ]
+        # Flatten the frame list for batching, decoding each frame once even if several patches overlap it
+        frame_tasks = {}
+        for idx, mapping in enumerate(high_mag_mappings):
+            for frame in mapping['frame_numbers']:
+                frame_tasks.setdefault(frame, {'frame_id': frame, 'task_index': idx})
+        frame_tasks = list(frame_tasks.values())
 
         # Limit the number of high mag frames
         # Randomly sample up to max_frames
@@ -478,6 +556,18 @@ class MagPairs:
             sampled_indices = random.sample(range(len(frame_tasks)), num_high_res_frames)
             frame_tasks = [frame_tasks[i] for i in sampled_indices]
 
+        # Split the pixel data into frames once, stopping as soon as every requested frame is found
+        wanted = {task['frame_id'] for task in frame_tasks}
+        frame_bytes = {}
+        if wanted:
+            for i, frame_data in enumerate(generate_pixel_data_frame(dcm.PixelData, dcm.NumberOfFrames)):
+                if i in wanted:
+                    frame_bytes[i] = frame_data
+                    if len(frame_bytes) == len(wanted):
+                        break
+        for task in frame_tasks:
+            task['frame_data'] = frame_bytes.get(task['frame_id'])
+
         # Initialize tqdm for progress tracking
         results = []
         with tqdm(total=len(frame_tasks), desc="Extracting Frames", unit="frame") as pbar:
@@ -488,41 +578,33 @@ class MagPairs:
                     results.extend(batch_results)
                     pbar.update(len(batch))
 
-        # Clean up shared memory
-        shared_mem.close()
-        shared_mem.unlink()
-
         logging.debug(f"Extracted {len(results)} high-res frames.")
         return results
 
     @staticmethod
     def process_frame_batch(task):
         """
-        Process a single frame using shared memory.
+        Decode a single frame.
 
         Args:
-            task: Task dictionary containing shared memory name, frame_id, and metadata.
+            task: Task dictionary containing the frame_id and the encoded frame_data bytes.
 
         Returns:
             Extracted frame as a NumPy array.
         """
-        shared_mem = shared_memory.SharedMemory(name=task['shared_mem_name'])
-        shared_pixel_data = np.ndarray((shared_mem.size,), dtype=np.uint8, buffer=shared_mem.buf)
-
         frame_id = task['frame_id']
-        total_frames = task['total_frames']
-
-        frame_generator = generate_pixel_data_frame(shared_pixel_data.tobytes(), total_frames)
-        for i, frame_data in enumerate(frame_generator):
-            if i == frame_id:
-                try:
-                    img = Image.open(io.BytesIO(frame_data))
-                    img_arr = np.array(img)
-                    if np.mean(img_arr) < 220:
-                        return {'img_arr':img_arr,'frame_id':frame_id}
-                    break
-                except Exception as e:
-                    logging.error(f"Failed to decode frame {frame_id}: {e}")
+        frame_data = task['frame_data']
+        if frame_data is None:
+            return None
+
+        try:
+            img = Image.open(io.BytesIO(frame_data))
+            img_arr = np.array(img)
+            # Tissue check on the decoded array directly; no per-pixel PIL conversion
+            if img_arr.mean() < BACKGROUND_MEAN:
+                return {'img_arr':img_arr,'frame_id':frame_id}
+        except Exception as e:
+            logging.error(f"Failed to decode frame {frame_id}: {e}")
 
     @staticmethod
     def get_local_dcm_pair(dcm, bq_results_df):
@@ -537,33 +619,33 @@ class MagPairs:
         return float(dcm.SharedFunctionalGroupsSequence[0].PixelMeasuresSequence[0].PixelSpacing[0])
 
     def get_frame_dict(self, dcm_input):
+        """
+        Describe the high-resolution frame grid as columnar arrays.
+
+        Args:
+            dcm_input: DICOM object or path.
+
+        Returns:
+            np.ndarray: Array of shape (grid_rows * grid_cols, 7) in row-major frame order with columns
+                        row_min, row_max, col_min, col_max, frame, row, col.
+        """
         dcm, total_pixel_matrix_columns, total_pixel_matrix_rows, columns, rows, grid_rows, grid_cols = parse_dcm_info(
             dcm_input
         )
-        frame_list = []
         self.grid_cols = grid_cols  # Store grid_cols for later use if needed
 
-        for row in range(grid_rows):
-            for col in range(grid_cols):
-                frame_index = row * grid_cols + col + 1  # Correct frame numbering
-                # Adjust for edge frames
-                row_min = row * rows
-                row_max = min((row + 1) * rows, total_pixel_matrix_rows)  # Ensure row_max doesn't exceed matrix height
-                col_min = col * columns
-                col_max = min((col + 1) * columns, total_pixel_matrix_columns)
-
-                frame_list.append({
-                    'row_min': row_min,
-                    'row_max': row_max,
-                    'col_min': col_min,
-                    'col_max': col_max,
-                    'frame': frame_index,
-                    'row_col': (row, col)
-                })
+        rr, cc = np.mgrid[0:grid_rows, 0:grid_cols]
+        rr, cc = rr.ravel(), cc.ravel()
+        row_min = rr * rows
+        row_max = np.minimum(row_min + rows, total_pixel_matrix_rows)  # Ensure row_max doesn't exceed matrix height
+        col_min = cc * columns
+        col_max = np.minimum(col_min + columns, total_pixel_matrix_columns)
+        frame_index = rr * grid_cols + cc + 1  # Correct frame numbering
 
-        return frame_list
+        return np.stack([row_min, row_max, col_min, col_max, frame_index, rr, cc], axis=1).astype(np.int64)
 
-    def get_minmax(self, img_to_use_at_low_mag):
+    @staticmethod
+    def get_minmax(img_to_use_at_low_mag):
         """
         Calculate pixel ranges for patches in low-resolution image coordinates.
 
@@ -573,9 +655,7 @@ class MagPairs:
                 - `patch` (PIL.Image.Image): The image patch.
                 - `raw_range` (tuple): The (row, col) position of the patch in the low-resolution image grid.
                 - `idx` (int): The index of the patch.
-
-            patch_size (tuple):
-                The size of each patch (height, width) in pixels.
+                The patch size is read from each `patch` itself.
 
         Returns:
             list of dict:
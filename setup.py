@@ -15,7 +15,7 @@ def read_readme(filename):
 
 setup(
     name="minipath",
-    version="0.1.14",
+    version="0.1.15",
     description="A tool for processing and analyzing digital pathology images stored in DICOM format.",
     long_description=read_readme('README.md'),
     long_description_content_type='text/markdown',